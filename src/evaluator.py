@@ -1,3 +1,116 @@
+import itertools
+import numpy as np
+from .monitor import shownValue
+
+# Numba is optional.
+# When installed, the threshold checks are compiled into native code;
+# otherwise, they fall back to plain NumPy comparisons.
+try:
+  from numba import njit, prange
+except ImportError:
+  njit = None
+  prange = range
+
+
+
+
+
+def snapshotArrays(snapshot):
+  """
+  :type snapshot: list | tuple
+  :param snapshot: processes recorded in a monitoring snapshot
+
+  Lay out a monitoring snapshot as one array per measurement,
+  i.e. CPU usage, memory usage and runtime,
+  so that each threshold can be checked for all processes at once.
+
+  Unknown (None) usages are stored as NaN, which never exceeds any threshold.
+  Usages are rounded as they are shown in the tables (see `shownValue()`).
+  """
+  n = len(snapshot)
+  cpu = np.fromiter(
+    ( np.nan if proc.cpu_usage is None else shownValue( proc.cpu_usage ) for proc in snapshot ),
+    dtype=np.float64, count=n
+  )
+  mem = np.fromiter(
+    ( np.nan if proc.memory_usage is None else shownValue( proc.memory_usage ) for proc in snapshot ),
+    dtype=np.float64, count=n
+  )
+  runtime = np.fromiter( ( proc.runtime for proc in snapshot ), dtype=np.float64, count=n )
+  return cpu, mem, runtime
+
+
+
+
+
+def packSnapshots(snapshots):
+  """
+  :type snapshots: list
+  :param snapshots: monitoring snapshots, each a list of processes
+
+  Lay out the processes of all snapshots back to back in one set of arrays,
+  so that the thresholds can be checked for every snapshot at once.
+
+  Returns all the processes in a flat list, their arrays (see `snapshotArrays()`),
+  and where each snapshot starts and ends in them:
+  the processes of the `i`th snapshot lie in `bounds[i]:bounds[i+1]`.
+  """
+  procs = list( itertools.chain.from_iterable( snapshots ) )
+  bounds = np.zeros( len(snapshots) + 1, dtype=np.intp )
+  np.cumsum( [ len(s) for s in snapshots ], out=bounds[1:] )
+  return procs, snapshotArrays(procs), bounds
+
+
+
+
+
+def thresholdMasksLoop(cpu, mem, runtime, cpu_threshold, mem_threshold, runtime_threshold):
+  """
+  Check all three thresholds in a single sweep over the processes.
+
+  Returns three boolean arrays telling which processes exceed
+  the CPU, memory and runtime thresholds respectively.
+  """
+  n = cpu.shape[0]
+  cpuMask = np.empty(n, np.bool_)
+  memMask = np.empty(n, np.bool_)
+  runtimeMask = np.empty(n, np.bool_)
+  for i in prange(n):
+    cpuMask[i] = cpu[i] > cpu_threshold
+    memMask[i] = mem[i] > mem_threshold
+    runtimeMask[i] = runtime[i] > runtime_threshold
+  return cpuMask, memMask, runtimeMask
+
+
+
+
+
+if njit is not None:
+  # Compiled once and cached on the disk, so later runs skip the compilation
+  thresholdMasks = njit( cache=True, parallel=True, boundscheck=False )( thresholdMasksLoop )
+else:
+  def thresholdMasks(cpu, mem, runtime, cpu_threshold, mem_threshold, runtime_threshold):
+    """
+    Same as `thresholdMasksLoop()`, but with NumPy comparisons over whole arrays
+    """
+    return cpu > cpu_threshold, mem > mem_threshold, runtime > runtime_threshold
+
+
+
+
+
+def warmUp():
+  """
+  Evaluate a dummy snapshot once,
+  so that compiling the threshold checks (with Numba) does not delay real evaluations.
+  """
+  dummy = np.zeros(1, dtype=np.float64)
+  thresholdMasks( dummy, dummy, dummy, 0.0, 0.0, 0.0 )
+
+
+
+
+
 def evaluate(snapshot, cpu_threshold: int|float, mem_threshold: int|float, runtime_threshold: int|float ):
   """
   :type snapshot: tuple
@@ -18,22 +131,63 @@ def evaluate(snapshot, cpu_threshold: int|float, mem_threshold: int|float, runti
   - excessive memory usage
   - runtime way too long (typcially over an hour)
   """
-  results = {
-    "cpu_violations": [],
-    "mem_violations": [],
-    "runtime_violations": []
-  }
+  cpu, mem, runtime = snapshotArrays(snapshot)
+  cpuMask, memMask, runtimeMask = thresholdMasks(
+    cpu, mem, runtime,
+    float(cpu_threshold), float(mem_threshold), float(runtime_threshold)
+  )
 
   # Detect any processes that either:
   # - consumes too much CPU (over 70 %)
   # - occupies too much memory (over 500 MB)
   # - has been running for at least an hour
-  for proc in snapshot:
-    if proc["cpu_usage"] is not None and proc["cpu_usage"] > cpu_threshold:
-      results["cpu_violations"].append(proc)
-    if proc["memory_usage"] is not None and proc["memory_usage"] > mem_threshold:
-      results["mem_violations"].append(proc)
-    if proc["runtime"] > runtime_threshold:
-      results["runtime_violations"].append(proc)
+  #
+  # Each threshold is compared against all processes at once,
+  # then only the processes exceeding it are picked out of the snapshot.
+  results = {
+    "cpu_violations": [ snapshot[i] for i in np.flatnonzero( cpuMask ) ],
+    "mem_violations": [ snapshot[i] for i in np.flatnonzero( memMask ) ],
+    "runtime_violations": [ snapshot[i] for i in np.flatnonzero( runtimeMask ) ]
+  }
 
   return results
+
+
+
+
+
+def evaluateBatch(snapshots, cpu_threshold: int|float, mem_threshold: int|float, runtime_threshold: int|float ):
+  """
+  :type snapshots: list
+  :param snapshots: monitoring snapshots, each a list of processes
+
+  Evaluate many monitoring snapshots at once, the same way as `evaluate()`.
+  All the processes are checked against the thresholds in a single call,
+  instead of one call per snapshot.
+
+  Yields the results of `evaluate()` for each snapshot, in the same order,
+  so that each one can be used (e.g. summarised) as soon as it is picked out,
+  without keeping the results of all snapshots at once.
+  """
+  procs, ( cpu, mem, runtime ), bounds = packSnapshots(snapshots)
+  masks = thresholdMasks(
+    cpu, mem, runtime,
+    float(cpu_threshold), float(mem_threshold), float(runtime_threshold)
+  )
+
+  # For each threshold, find all the processes exceeding it,
+  # and where those of each snapshot start and end among them
+  exceeding = [ np.flatnonzero( mask ) for mask in masks ]
+  cuts = [ np.searchsorted( e, bounds ) for e in exceeding ]
+
+  # Then pick out the exceeding processes of one snapshot at a time
+  for i in range( len(snapshots) ):
+    cpuExceed, memExceed, runExceed = (
+      [ procs[j] for j in e[ c[i] : c[i+1] ] ]
+      for ( e, c ) in zip( exceeding, cuts )
+    )
+    yield {
+      "cpu_violations": cpuExceed,
+      "mem_violations": memExceed,
+      "runtime_violations": runExceed
+    }
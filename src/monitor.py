@@ -8,11 +8,18 @@ What this script does:
 """
 
 import os          # To detect system resources
+import sys
 import psutil      # necessary for system monitoring, particularly for industrial purposes
 import time        # for monitoring for a fixed period
 import datetime
+import functools
 import math
+import numpy as np
+import operator
+import string
+from array import array
 from pathlib import Path
+from typing import NamedTuple
 
 # Base directory to save a log file
 BASE_DIR = Path(__file__).parent.resolve().parent
@@ -21,28 +28,104 @@ DATA_DIR = BASE_DIR / "logs"
 # Create a directory similar to "./../logs" if not exist
 DATA_DIR.mkdir(exist_ok=True)
 
-# Fields to draw a table sheet
-FIELDS = [
-  {"name": "process_id",   "column_width": 10, "align": "right", "format": "{x}" },
-  {"name": "process_name", "column_width": 50, "align": "left",  "format": "{x}"},
-  {"name": "cpu_usage",    "column_width": 9,  "align": "right", "format": "{x:.1f} %"},
-  {"name": "memory_usage", "column_width": 12, "align": "right", "format": "{x:.1f} MB"},
-  {"name": "runtime",      "column_width": 13, "align": "right", "format": "{x:d} sec." }
-]
+# Size of the write buffer of an opened log file, in bytes.
+# Large enough to hold a whole monitoring round (or test report) until it is flushed at once.
+LOG_BUFFER_SIZE = 1 << 20
+
+# Whether this program is shown in a terminal.
+# If not (e.g. its output is redirected), logged text is only written to log files.
+STDOUT_IS_TTY = sys.stdout is not None and sys.stdout.isatty()
+
+# Windows consoles (Windows 10 and later) only understand ANSI escape sequences,
+# used to clear the screen, after running any shell command once
+if os.name == "nt" and STDOUT_IS_TTY:
+  os.system("")
+
+# Bytes in a (Windows') MB, which is equivalent to MiB
+BYTES_PER_MB = 1024 * 1024
+
+# Number of logical CPUs, which is fixed while this program runs.
+# The CPU usage of a process is divided by it to get a percentage of the whole CPU.
+CPU_COUNT = psutil.cpu_count(True) or 1
+
+# On Linux, processes are read directly from the /proc file system,
+# which needs a few constants of the system to convert its values
+IS_LINUX = sys.platform.startswith("linux")
+if IS_LINUX:
+  CLOCK_TICKS = os.sysconf("SC_CLK_TCK")   # clock ticks per second, the unit of CPU times in /proc
+  PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")   # bytes per memory page, the unit of memory in /proc
+  MB_PER_PAGE = PAGE_SIZE / BYTES_PER_MB   # (Windows') MB per memory page
+  BOOT_TIME = psutil.boot_time()           # when the system started up, as a timestamp
+
+# CPU time used by each process seen in the previous snapshot on Linux,
+# to calculate how much CPU it has used since then.
+# Maps a process id to ( start time in ticks, CPU time in ticks, when it was read )
+lastCpuTimes = {}
+
+# Processes seen in the previous snapshot through psutil, kept between snapshots,
+# so that they do not lose their previous CPU reading.
+# Maps a process id to its psutil.Process
+knownProcs = {}
+
+# Threshold values to show system warnings if passed
+THRESHOLD_CPU = 70.0        # as percent (%)
+THRESHOLD_MEM = 500.0       # as MB
+THRESHOLD_RUNTIME = 3600    # seconds
+
+class Field(NamedTuple):
+  """
+  A field (column) of a table sheet.
+
+  :type name: str
+  :param name: name of the field, which is also its header
+
+  :type align: str
+  :param align: how values are aligned in the column, either "left" or "right"
+
+  :type format: str
+  :param format: template to format a value of the field, e.g. "{x:.1f} %"
 
+  :type unit_spaces: int
+  :param unit_spaces: how many spaces the unit after a value occupies in the table
+  """
+  name: str
+  align: str
+  format: str
+  unit_spaces: int
+
+# Fields to draw a table sheet.
+# These are never changed: column widths are worked out for each table separately.
+FIELDS = (
+  Field( "process_id",   "right", "{x}",        0 ),
+  Field( "process_name", "left",  "{x}",        0 ),
+  Field( "cpu_usage",    "right", "{x:.1f} %",  2 ), # percent (%)
+  Field( "memory_usage", "right", "{x:.1f} MB", 3 ), # megabytes (Windows' MB)
+  Field( "runtime",      "right", "{x:d} sec.", 5 )  # seconds (sec.)
+)
+
+# How the value of each field is measured to work out column widths:
+# values are kept unrounded, so each one is measured as its format renders it (e.g. `.1f`).
+# The format specs never change, so they are parsed only once.
+FIELD_MEASURES = tuple(
+  ( f.name, next( string.Formatter().parse( f.format ) )[2], f.unit_spaces ) for f in FIELDS
+)
 
 
 
 
-def Process(pid:int, name:str, cpu_usage, memory_usage, runtime:int):
+
+class Process(NamedTuple):
   """
-  Docstring for Process
+  A process recorded in a snapshot.
 
-  :type pid: int
-  :param pid: identifying number of this process
+  Its values are read as attributes, e.g. `proc.cpu_usage`,
+  in the same order as the fields of a table sheet (`FIELDS`).
 
-  :type name: str
-  :param name: Description
+  :type process_id: int
+  :param process_id: identifying number of this process
+
+  :type process_name: str
+  :param process_name: name of this process (may not be unique)
 
   :type cpu_usage: float
   :param cpu_usage: how much CPU has been consumed by this process, in percent (%)
@@ -53,51 +136,62 @@ def Process(pid:int, name:str, cpu_usage, memory_usage, runtime:int):
   :type runtime: int
   :param runtime: how long has this process been running since started up, in seconds
   """
-  return {
-    "process_id": pid,
-    "process_name": name,
-    "cpu_usage": cpu_usage,
-    "memory_usage": memory_usage,
-    "runtime": runtime
-  }
+  process_id: int
+  process_name: str
+  cpu_usage: float
+  memory_usage: float
+  runtime: int
 
 
 
 
 
-def PrintAndLog(str :str="", end :str="\n", file :str="OS_process_monitoring-log.txt"):
+def openLog(file :str="OS_process_monitoring-log.txt"):
   """
-  Write a line of text to a new file.
+  Open a log file under the log directory once, for appending.
+
+  The returned file object keeps a large write buffer,
+  so many lines can be logged before anything is written to the disk.
+  Call `flush()` on it once the lines of a monitoring round are all logged.
 
-  Then print a line of text in the terminal.
+  :type file: str | Path
+  :param file: name of the log file under the log directory,
+               or its full path if already joined with the log directory
   """
+  path = file if isinstance( file, Path ) else DATA_DIR / file
+  return path.open( "a", encoding="utf-8", buffering=LOG_BUFFER_SIZE )
 
-  # The full path to the log file
-  path = DATA_DIR / file
 
-  with path.open("a", encoding="utf-8") as f:
-    f.write(str)
-    f.write(end)
-  print( str, end=end )
 
 
 
+def PrintAndLog(str :str="", end :str="\n", file="OS_process_monitoring-log.txt"):
+  """
+  Write a line of text to a log file.
 
+  Then print a line of text in the terminal, if there is one.
 
-def dataFormat(value, template):
-  """
-  use for formatting values in strings
-  
-  :param value: string to substitute into the template
-  :param template: string template where value can be substituted
+  :param file: either the name or the full path of a log file, which is then opened for this line only,
+               or a log file already opened by `openLog()`
   """
-  return template.format(x=value)
 
+  # Join the text and its ending first, so that each output gets a single write
+  line = str + end
+
+  if hasattr(file, "write"):
+    file.write(line)
+  else:
+    with openLog(file) as f:
+      f.write(line)
+  if STDOUT_IS_TTY:
+    sys.stdout.write(line)
 
 
 
 
-def drawSeparationLine(fields):
+
+@functools.lru_cache(maxsize=32)
+def drawSeparationLine(widths: tuple):
   """
   How length of a horizontal border in sheets is calculated:
   - Calculate how many spaces all headers' names uses.
@@ -120,54 +214,72 @@ def drawSeparationLine(fields):
   Length of the `EXAMPLE` header: 7 chars + 1 left gap + 1 right gap = 9 spaces (dashes)
 
   Plus signs needed for all headers: 3 headers + 1 = 4 spaces (plus signs)
+
+  Tables drawn with the same column widths (e.g. the same processes in every monitoring)
+  share the same line, so it is remembered instead of being drawn again.
+
+  :type widths: tuple
+  :param widths: column widths of all fields
   """
-  line = ""
-  for field in fields:
-    line += f"+{ "-" * ( 1 + field['column_width'] + 1 ) }"
-  line += "+\n"
-  return line
+  return "+" + "+".join( "-" * ( 1 + width + 1 ) for width in widths ) + "+\n"
 
 
 
 
 
-def logHeader(fields):
+def logHeader(fields, widths):
   """
   Print fields and their names in a table sheet
   
   :param fields: a field tuple
-  :param file: file to write headers to
+  :param widths: column widths of the fields
   """
-  fieldCtnt = ""
-  for field in fields:
-    fieldCtnt += f"| { field['name']:<{ field['column_width'] }} "
-  fieldCtnt += "|\n"
-  return fieldCtnt
+  return "".join( f"| { field.name:<{ width }} " for ( field, width ) in zip( fields, widths ) ) + "|\n"
 
 
 
 
 
-def logRowInfo(fields, row):
+def cellTemplate(field, width: int, key="x"):
   """
-  Docstring for logRowInfo
-  
-  :param fields: a field tuple
-  :param row: a row of data
-  :param file: file to write the row info to
+  Combine the value format of a field and the layout of its column into one template,
+  so that a cell can be drawn with a single `str.format()` call.
+
+  For example, a right-aligned `{x:.1f} %` field whose column is 9 spaces wide
+  becomes `| {x:>7.1f} % `: the value is padded to 7 spaces,
+  and the unit after it (2 spaces) fills up the rest of the column.
+
+  :param field: a field in a table sheet
+  :type width: int
+  :param width: column width of the field
+  :param key: name or position of the value in the template
+  """
+  ( _, _, valueSpec, _ ), *unitParts = string.Formatter().parse( field.format )
+  unit = "".join( literal for ( literal, _, _, _ ) in unitParts )
+  align = ">" if field.align == "right" else "<"
+  valueWidth = width - len(unit)
+  return f"| {{{key}:{align}{valueWidth}{valueSpec}}}{unit} "
+
+
+
+
+
+@functools.lru_cache(maxsize=32)
+def rowTemplate(widths: tuple):
   """
-  rowCtnt = ""
+  Combine the cell templates of all fields into one template for a whole row,
+  so that a row can be drawn with a single `str.format()` call.
+
+  For example, `| {0:>10} | {1:<12} | {2:>7.1f} % | {3:>9.1f} MB | {4:>3d} sec. |`
+  takes the values of a row in the order of the fields.
 
-  # print the record in different field values
-  for i in range( len(FIELDS) ):
-    curCol = FIELDS[i]
-    attrData = fields[i]
-    if curCol["align"] == "right":
-      rowCtnt += f"| {dataFormat( row[ curCol["name"] ], attrData['format'] ):>{attrData['column_width']}} "
-    else:
-      rowCtnt += f"| {dataFormat( row[ curCol["name"] ], attrData['format'] ):<{attrData['column_width']}} "
-  rowCtnt += "|\n"
-  return rowCtnt
+  Like separation lines, it is remembered for tables drawn with the same column widths.
+
+  :type widths: tuple
+  :param widths: column widths of all fields
+  """
+  cells = [ cellTemplate( field, width, i ) for ( i, ( field, width ) ) in enumerate( zip( FIELDS, widths ) ) ]
+  return "".join( cells ) + "|\n"
 
 
 
@@ -180,85 +292,360 @@ def LogProcessTable(rows):
   if len(rows) == 0:
     return ""
 
-  for f in FIELDS:
-    # how many spaces the unit occupies in the table. Set to zero by default unless specified
-    unitOccupySpaces = 0
-    fieldName = f["name"]
-    if fieldName == "cpu_usage":      # uses percent (%), occupies 2 spaces
-      unitOccupySpaces = 2
-    elif fieldName == "memory_usage": # uses megabytes (Windows' MB), occupies 3 spaces
-      unitOccupySpaces = 3
-    elif fieldName == "runtime":      # uses seconds (sec.), occupies 5 spaces
-      unitOccupySpaces = 5
+  # Start from the spaces the header of each field occupies...
+  colWidths = [ len( f.name ) for f in FIELDS ]
 
-    # Find the value of a specific field that occupies the most spaces...
-    maxValueLength = max( [ len( str( r[ fieldName ] ) ) + unitOccupySpaces for r in rows ] )
+  # ...then find the value of each field that occupies the most spaces,
+  # going through all the rows only once for all the fields.
+  # The most spacious one sets the column width of each field.
+  for r in rows:
+    for i, ( fieldName, valueSpec, unitSpaces ) in enumerate( FIELD_MEASURES ):
+      valueLength = len( format( getattr( r, fieldName ), valueSpec ) ) + unitSpaces
+      if valueLength > colWidths[i]:
+        colWidths[i] = valueLength
 
-    # ...then find the value of the header that occupies the most spaces.
-    headerValueLength = len( fieldName )
+  # Collect all the pieces of the sheet first,
+  # then join them into one string at once
+  tableParts = []
 
-    # Finally, set the more spacious one as the column width of the current field
-    f["column_width"] = max( maxValueLength, headerValueLength )
-
-  tableCtnt = ""
+  # All the separation lines of a sheet are the same, so draw it only once
+  separationLine = drawSeparationLine( tuple(colWidths) )
 
   # Draw headers of the sheet
-  tableCtnt += drawSeparationLine(FIELDS) + logHeader(FIELDS) + drawSeparationLine(FIELDS)
-
-  # Draw all rows of the sheet
+  tableParts.append( separationLine )
+  tableParts.append( logHeader(FIELDS, colWidths) )
+  tableParts.append( separationLine )
+
+  # Draw all rows of the sheet.
+  # How a row is drawn, and which values of it are shown,
+  # are prepared once for all the rows.
+  rowFormat = rowTemplate( tuple(colWidths) ).format
+  rowValues = operator.attrgetter( *[ f.name for f in FIELDS ] )
   for i in range( len(rows) ):
-    tableCtnt += logRowInfo( FIELDS, rows[i] )
+    tableParts.append( rowFormat( *rowValues( rows[i] ) ) )
 
-  tableCtnt += drawSeparationLine( FIELDS )
-  return tableCtnt
+  tableParts.append( separationLine )
+  return "".join( tableParts )
 
 
 
 
 
-def getSnapshot( curTimeInSec: int | float, procList ):
+def sortFaults(procs, firstIndex: int, values, faults):
   """
-  Get a snapshot to test OS monitoring system
+  Sort out the processes exceeding the CPU, memory and runtime thresholds.
+
+  Each threshold is compared against the values of all processes at once with NumPy,
+  and a process can exceed more than one threshold at once.
+
+  :param procs: list of processes in a snapshot
+  :type firstIndex: int
+  :param firstIndex: index in `procs` of the first process the values belong to
+  :param values: CPU usages, memory usages and runtimes of the processes, as three arrays
+  :param faults: three lists to append the processes exceeding the CPU, memory and runtime thresholds to
   """
-  snapshots = []
+  thresholds = ( THRESHOLD_CPU, THRESHOLD_MEM, THRESHOLD_RUNTIME )
+  for ( fieldValues, threshold, faultList ) in zip( values, thresholds, faults ):
+    for i in np.flatnonzero( np.asarray( fieldValues ) > threshold ):
+      faultList.append( procs[ firstIndex + i ] )
 
-  for proc in psutil.process_iter(
-    attrs=["pid", "name", "cpu_percent", "memory_info", "create_time"]
-  ):
+
+
+
+
+def shownValue(value: float):
+  """
+  Round a usage the same way as it is shown in the tables (`.1f`).
+
+  Usages are compared against the thresholds as rounded by this,
+  so that e.g. 70.04 % (shown as "70.0 %") is not reported as over 70.0 %.
+  """
+  return round( value, 1 )
+
+
+
+
+
+def asProcSet(procSet):
+  """
+  Names are looked up for every process on the system, so make sure it takes constant time:
+  any collection of names other than a frozenset (e.g. a list) is turned into one.
+  """
+  return procSet if isinstance( procSet, frozenset ) else frozenset( procSet )
+
+
+
+
+
+class SnapshotCollector:
+  """
+  Collects the processes of a snapshot while it is being taken.
+
+  The values to compare against the thresholds are collected along with the processes,
+  then the problematic processes are sorted out all at once with `sortFaults()`
+  when the snapshot is finished.
+
+  :type out: list | None
+  :param out: list to append the processes to. A new list is made if not given.
+
+  :type faults: tuple | None
+  :param faults: three lists to sort the processes exceeding the CPU, memory and runtime thresholds into.
+                 Nothing is sorted if not given.
+  """
+
+  def __init__(self, out=None, faults=None):
+    self.procs = [] if out is None else out
+    self.faults = faults
+    self.firstIndex = len( self.procs )
+    self.values = ( array( "d" ), array( "d" ), array( "d" ) )
+
+  def add(self, proc: Process):
+    """
+    Add a process to the snapshot
+    """
+    self.procs.append( proc )
+    if self.faults is not None:
+      ( cpuValues, memValues, runtimeValues ) = self.values
+      cpuValues.append( shownValue( proc.cpu_usage ) )
+      memValues.append( shownValue( proc.memory_usage ) )
+      runtimeValues.append( proc.runtime )
+
+  def finish(self):
+    """
+    Sort out the problematic processes, then return all the processes of the snapshot
+    """
+    if self.faults is not None:
+      sortFaults( self.procs, self.firstIndex, self.values, self.faults )
+    return self.procs
+
+
+
+
+
+def readProcFile(path: str):
+  """
+  Read a small file in the /proc file system with a single system call.
+
+  :type path: str
+  :param path: path to the file, such as "/proc/1/stat"
+  """
+  fd = os.open( path, os.O_RDONLY )
+  try:
+    return os.read( fd, 4096 )
+  finally:
+    os.close( fd )
+
+
+
+
+
+def linuxSnapshot( curTimeInSec: int | float, procSet, out=None, faults=None ):
+  """
+  Get a snapshot to test OS monitoring system, on Linux only.
+
+  Same as `psutilSnapshot()`, but reads `/proc/<pid>/stat` and `/proc/<pid>/statm`
+  directly instead of going through psutil.
+
+  :type curTimeInSec: int | float
+  :param curTimeInSec: current time as a timestamp, in seconds
+
+  :type procSet: frozenset
+  :param procSet: names of the processes to monitor. Every process is monitored if empty.
+                  Any other collection of names (e.g. a list) is turned into a frozenset first.
+
+  :type out: list | None
+  :param out: list to append the processes to, e.g. one reused across snapshots.
+              A new list is made if not given.
+
+  :type faults: tuple | None
+  :param faults: three lists to sort the processes exceeding the CPU, memory and runtime thresholds into,
+                 while the snapshot is being taken. Nothing is sorted if not given.
+  """
+  procSet = asProcSet( procSet )
+  snapshot = SnapshotCollector( out, faults )
+  seenCpuTimes = {}
+  readTime = time.monotonic()
+
+  for entry in os.listdir( "/proc" ):
+    if not entry.isdigit():
+      continue
+    procId = int( entry )                                        # process id
+
+    try:
+      stat = readProcFile( f"/proc/{procId}/stat" )
+
+      # The process name is put in brackets and may contain spaces,
+      # so the other values are only split after the last bracket
+      nameEnd = stat.rfind( b")" )
+      procName = stat[ stat.find( b"(" ) + 1 : nameEnd ].decode( errors="replace" )
+
+      # The kernel cuts the name down to 15 characters,
+      # in which case the full name is taken from the command line (same as psutil)
+      if len( procName ) >= 15:
+        cmdline = readProcFile( f"/proc/{procId}/cmdline" ).split( b"\0" )[0]
+        fullName = os.path.basename( cmdline.decode( errors="replace" ) )
+        if fullName.startswith( procName ):
+          procName = fullName
+
+      if procSet and procName not in procSet:
+        continue
+
+      # Resident memory, in pages
+      rssPages = int( readProcFile( f"/proc/{procId}/statm" ).split()[1] )
+    except OSError:
+      # The process has ended, or cannot be accessed
+      continue
+
+    # Values after the name start from the 3rd field of the stat file:
+    # user CPU time (14th), system CPU time (15th) and start time (22nd), all in clock ticks
+    values = stat[ nameEnd + 2 : ].split()
+    cpuTicks = int( values[11] ) + int( values[12] )
+    startTicks = int( values[19] )
+
+    # CPU usage in percentage, since this process was seen in the previous snapshot.
+    # A process seen for the first time reports 0 %, the same as psutil does.
+    procCPU = 0.0
+    lastSeen = lastCpuTimes.get( procId )
+    if lastSeen is not None and lastSeen[0] == startTicks and readTime > lastSeen[2]:
+      cpuSecs = ( cpuTicks - lastSeen[1] ) / CLOCK_TICKS
+      procCPU = cpuSecs / ( readTime - lastSeen[2] ) * 100 / CPU_COUNT
+    seenCpuTimes[ procId ] = ( startTicks, cpuTicks, readTime )
+
+    # Memory usage in (Windows') MB, the same as in `psutilSnapshot()`
+    procMem = rssPages * MB_PER_PAGE
+
+    # Time running since started up, in seconds
+    procRuntime = int( curTimeInSec - ( BOOT_TIME + startTicks / CLOCK_TICKS ) )
+
+    snapshot.add( Process( procId, procName, procCPU, procMem, procRuntime ) )
+
+  # Only keep the processes still running for the next snapshot
+  lastCpuTimes.clear()
+  lastCpuTimes.update( seenCpuTimes )
+
+  return snapshot.finish()
+
+
+
+
+
+def psutilSnapshot( curTimeInSec: int | float, procSet, out=None, faults=None ):
+  """
+  Get a snapshot to test OS monitoring system, through psutil on any platform
+
+  :type curTimeInSec: int | float
+  :param curTimeInSec: current time as a timestamp, in seconds
+
+  :type procSet: frozenset
+  :param procSet: names of the processes to monitor. Every process is monitored if empty.
+                  Any other collection of names (e.g. a list) is turned into a frozenset first.
+
+  :type out: list | None
+  :param out: list to append the processes to, e.g. one reused across snapshots.
+              A new list is made if not given.
+
+  :type faults: tuple | None
+  :param faults: three lists to sort the processes exceeding the CPU, memory and runtime thresholds into,
+                 while the snapshot is being taken. Nothing is sorted if not given.
+  """
+  procSet = asProcSet( procSet )
+  snapshot = SnapshotCollector( out, faults )
+
+  # Forget the processes that have ended since the previous snapshot
+  pids = psutil.pids()
+  for procId in knownProcs.keys() - set( pids ):
+    del knownProcs[ procId ]
+
+  for procId in pids:                                            # process id
     try:
-      if len(procList) > 0 and proc.info["name"] not in procList:
+      # A process id may have been taken over by a new process since the previous snapshot
+      # (Windows reuses ids quickly), so a remembered process is only reused if it is still running:
+      # `is_running()` also compares its start time.
+      proc = knownProcs.get( procId )
+      if proc is None or not proc.is_running():
+        proc = knownProcs[ procId ] = psutil.Process( procId )
+
+      # The name is read in every snapshot, as a process may rename itself
+      # (psutil itself remembers it on Windows, where it cannot change).
+      # The other attributes are read only for the processes to monitor.
+      procName = proc.name()                                     # process name (may not be unique)
+
+      if procSet and procName not in procSet:
         continue
 
-      procId = int( proc.info["pid"] )                           # process id
-      procName = proc.info["name"]                               # process name (may not be unique)
-
-      CPU_COUNT = psutil.cpu_count(True) ;
-      procCPU = round( proc.info["cpu_percent"] / CPU_COUNT, 1 ) # CPU usage in percentage
-
-      # Memory usage in megabytes.
-      # RSS shows memory consumption of a process when it runs alone
-      # and shares nothing with other processes.
-      #
-      # In practice, though, libraries are often shared among several processes,
-      # causing RSS to overestimate the memory consumption
-      #
-      # This parameter, i.e. proc.info['memory_info'], is originally recorded as bytes.
-      #
-      # Since Windows' MB is equivalent to MiB, which is equal to
-      # 1024 KiB and 1024 x 1024 B,
-      # this parameter is divided by 1024 twice to display the memory usage in Windows' MB.
-      procMem = round( float( proc.info['memory_info'].rss / 1024 / 1024 ), 1 )
-
-      # Time running since started up, in seconds
-      procRuntime = int( curTimeInSec - proc.info["create_time"] )
-
-      curProc = Process( procId, procName, procCPU, procMem, procRuntime )
-      snapshots.append( curProc )
-
-    except (psutil.NoSuchProcess, psutil.AccessDenied):
+      # Read all the other attributes of this process within one shot,
+      # so that the OS data shared by several attributes is fetched only once
+      with proc.oneshot():
+        procCPU = proc.cpu_percent() / CPU_COUNT                 # CPU usage in percentage
+
+        # Memory usage in megabytes.
+        # RSS shows memory consumption of a process when it runs alone
+        # and shares nothing with other processes.
+        #
+        # In practice, though, libraries are often shared among several processes,
+        # causing RSS to overestimate the memory consumption
+        #
+        # This parameter, i.e. proc.memory_info(), is originally recorded as bytes.
+        #
+        # Since Windows' MB is equivalent to MiB, which is equal to
+        # 1024 KiB and 1024 x 1024 B,
+        # this parameter is divided by 1024 x 1024 (at once) to display the memory usage in Windows' MB.
+        procMem = proc.memory_info().rss / BYTES_PER_MB
+
+        # Time running since started up, in seconds
+        procRuntime = int( curTimeInSec - proc.create_time() )
+
+      snapshot.add( Process( procId, procName, procCPU, procMem, procRuntime ) )
+
+    except psutil.NoSuchProcess:
+      knownProcs.pop( procId, None )
       continue
+    except psutil.AccessDenied:
+      continue
+
+  return snapshot.finish()
+
+
+
+
+
+# Chosen once when this module is loaded:
+# on Linux, reading the /proc file system directly is much cheaper than going through psutil
+getSnapshot = linuxSnapshot if IS_LINUX else psutilSnapshot
+
+
+
+
+
+def primeCpuUsage( procSet, warmUpSecs: int | float = 1 ):
+  """
+  The CPU usage of a process is measured since the last time it was read,
+  so a process read for the first time always reports 0 %.
+
+  Take a snapshot only to read every process once,
+  then wait a little so that the next snapshot measures a meaningful period of time.
+
+  :type procSet: frozenset
+  :param procSet: names of the processes to monitor. Every process is read if empty.
 
-  return snapshots
+  :type warmUpSecs: int | float
+  :param warmUpSecs: time to wait after reading the processes, in seconds
+  """
+  getSnapshot( time.time(), procSet )
+  time.sleep( warmUpSecs )
+
+
+
+
+
+def time_readable_format(dt: datetime.datetime):
+  """
+  Converts a date and time into a readable string, such as "17:39:31 on 2026-01-28".
+
+  The same as `dt.strftime( "%H:%M:%S on %Y-%m-%d" )`,
+  but put together from the fields directly, without parsing a format every time.
+  """
+  return f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d} on {dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
 
 
 
@@ -271,29 +658,25 @@ def duration_readable_format(secs: int):
   """
   if ( not isinstance(secs, int) ) or secs < 0:
     raise Exception( f"Number of seconds must be a natural number, but received {secs}" )
-  finTimeInfo :str = ""
-
   ( nMins, nSecs )  = divmod(secs, 60)
   ( nHrs, nMins )   = divmod(nMins, 60)
   ( nDays, nHrs )   = divmod(nHrs, 24)
   ( nWeeks, nDays ) = divmod(nDays, 7)
 
-  weekInfo = f"{ "1 week" if nWeeks == 1 else ( "" if nWeeks == 0 else f"{nWeeks} weeks" ) }"
-  dayInfo = f"{ "1 day" if nDays == 1 else ( "" if nDays == 0 else f"{nDays} days" ) }"
-  hrInfo = f"{ "1 hour" if nHrs == 1 else ( "" if nHrs == 0 else f"{nHrs} hours" ) }"
-  minInfo =  f"{ "1 minute" if nMins == 1 else ( "" if nMins == 0 else f"{nMins} minutes" ) }"
-  secInfo = f"{ "1 second" if nSecs == 1 else ( "" if ( nSecs == 0 and ( nWeeks > 0 or nDays > 0 or nHrs > 0 or nMins > 0 ) ) else f"{nSecs} seconds" ) }"
-
-  validTimeInfo = [ t for t in [ weekInfo, dayInfo, hrInfo, minInfo, secInfo ] if t != "" ]
-
-  for i in range( len(validTimeInfo) ):
-    finTimeInfo +=validTimeInfo[i]
-    if i + 2 < len(validTimeInfo):
-      finTimeInfo += ", "
-    elif i + 2 == len(validTimeInfo):
-      finTimeInfo += " and "
+  # Only the non-zero units are shown
+  timeParts = []
+  for ( n, singular, plural ) in [ ( nWeeks, "week",   "weeks" ),
+                                   ( nDays,  "day",    "days" ),
+                                   ( nHrs,   "hour",   "hours" ),
+                                   ( nMins,  "minute", "minutes" ),
+                                   ( nSecs,  "second", "seconds" ) ]:
+    if n:
+      timeParts.append( f"{n} { singular if n == 1 else plural }" )
 
-  return finTimeInfo
+  # e.g. "1 day, 2 hours and 3 seconds"
+  if len(timeParts) > 1:
+    return ", ".join( timeParts[:-1] ) + " and " + timeParts[-1]
+  return timeParts[0] if timeParts else "0 seconds"
 
 
 
@@ -304,10 +687,12 @@ def clearScreen():
   Clear terminal screen.
   Does not affect log file-writing.
   """
-  # clears the terminal
-  # For Windows: "cls"
-  # For MacOS, Linux, etc.: "clear"
-  os.system('cls' if os.name == 'nt' else 'clear')
+  # clears the terminal with ANSI escape sequences:
+  # erase the whole screen, then move the cursor to the top-left corner.
+  # Much cheaper than running "cls" or "clear" in a new process every time.
+  if STDOUT_IS_TTY:
+    sys.stdout.write( "\x1b[2J\x1b[H" )
+    sys.stdout.flush()
 
 
 
@@ -330,50 +715,47 @@ def OS_monitoring_summary( recTime,
     - suggestions to resolve the problems
   """
 
-  # Threshold values to show system warnings if passed
-  THRESHOLD_CPU = 70.0        # as percent (%)
-  THRESHOLD_MEM = 500.0       # as MB
-  THRESHOLD_RUNTIME = 3600    # seconds
-
-  resultCtnt = ""
+  # Collect all the parts of the summary first,
+  # then join them into one string at once
+  resultParts = []
 
   if len(recProcs) == 0:
     return f"No filtered processes detected { recTime }\n"
 
-  resultCtnt += f"Monitored processes recorded { recTime }\ncan be seen in the following table.\n\n"
-  resultCtnt += LogProcessTable(recProcs)
+  resultParts.append( f"Monitored processes recorded { recTime }\ncan be seen in the following table.\n\n" )
+  resultParts.append( LogProcessTable(recProcs) )
 
   # Display all the problems among the filtered, monitored processes
   if len(cpuFaultProcs) > 0 or len(memFaultProcs) > 0 or len(runTooLongProcs) > 0:
-    resultCtnt += "\nBeware: "
+    resultParts.append( "\nBeware: " )
     if cpuFaultProcs:
-      resultCtnt += f"{ len(cpuFaultProcs) } { "PROCESS" if len(cpuFaultProcs) == 1 else "PROCESSES" }\n"
-      resultCtnt += f"WITH HIGH CPU USAGE (OVER {THRESHOLD_CPU} %) DETECTED:\n"
-      resultCtnt += LogProcessTable(cpuFaultProcs)
-      resultCtnt += "Suggestion:\n"
-      resultCtnt += "1. Restart your computer/laptop to clear all running processes\n"
-      resultCtnt += "2. End/restart processes that consume too much CPU\n"
-      resultCtnt += "3. Update drivers to enhance CPU efficiency\n"
-      resultCtnt += "4. Scan for malwares or other harmful softwares\n"
+      resultParts.append( f"{ len(cpuFaultProcs) } { "PROCESS" if len(cpuFaultProcs) == 1 else "PROCESSES" }\n" )
+      resultParts.append( f"WITH HIGH CPU USAGE (OVER {THRESHOLD_CPU} %) DETECTED:\n" )
+      resultParts.append( LogProcessTable(cpuFaultProcs) )
+      resultParts.append( "Suggestion:\n" )
+      resultParts.append( "1. Restart your computer/laptop to clear all running processes\n" )
+      resultParts.append( "2. End/restart processes that consume too much CPU\n" )
+      resultParts.append( "3. Update drivers to enhance CPU efficiency\n" )
+      resultParts.append( "4. Scan for malwares or other harmful softwares\n" )
     if memFaultProcs:
-      resultCtnt += f"{ len(memFaultProcs) } { "PROCESS" if len(memFaultProcs) == 1 else "PROCESSES" }\n"
-      resultCtnt += f"WITH HIGH MEMORY USAGE (OVER {THRESHOLD_MEM} MB) DETECTED:\n"
-      resultCtnt += LogProcessTable(memFaultProcs)
-      resultCtnt += "Suggestion:\n"
-      resultCtnt += "Turn off the processes that occupies too much memory\n"
-      resultCtnt += "and release it to the other needed processes.\n"
+      resultParts.append( f"{ len(memFaultProcs) } { "PROCESS" if len(memFaultProcs) == 1 else "PROCESSES" }\n" )
+      resultParts.append( f"WITH HIGH MEMORY USAGE (OVER {THRESHOLD_MEM} MB) DETECTED:\n" )
+      resultParts.append( LogProcessTable(memFaultProcs) )
+      resultParts.append( "Suggestion:\n" )
+      resultParts.append( "Turn off the processes that occupies too much memory\n" )
+      resultParts.append( "and release it to the other needed processes.\n" )
     if runTooLongProcs:
-      resultCtnt += f"{ len(runTooLongProcs) } { "PROCESS" if len(runTooLongProcs) == 1 else "PROCESSES" } "
-      resultCtnt += f"WITH RUNTIME OVER {duration_readable_format(THRESHOLD_RUNTIME).upper()} DETECTED:\n"
-      resultCtnt += LogProcessTable(runTooLongProcs)
-      resultCtnt += "Suggestion:\nTurn off these unused processes to release CPU and memory\n"
-      resultCtnt += "resources to the other needed processes.\n"
-      resultCtnt += "NOTE: Only close them if necessary.\n"
-      resultCtnt += "Turning off indispensable programs may result in system failure.\n"
+      resultParts.append( f"{ len(runTooLongProcs) } { "PROCESS" if len(runTooLongProcs) == 1 else "PROCESSES" } " )
+      resultParts.append( f"WITH RUNTIME OVER {duration_readable_format(THRESHOLD_RUNTIME).upper()} DETECTED:\n" )
+      resultParts.append( LogProcessTable(runTooLongProcs) )
+      resultParts.append( "Suggestion:\nTurn off these unused processes to release CPU and memory\n" )
+      resultParts.append( "resources to the other needed processes.\n" )
+      resultParts.append( "NOTE: Only close them if necessary.\n" )
+      resultParts.append( "Turning off indispensable programs may result in system failure.\n" )
   else:
-    resultCtnt += f"\nNo problematic processes found {recTime}\n"
+    resultParts.append( f"\nNo problematic processes found {recTime}\n" )
 
-  return resultCtnt
+  return "".join( resultParts )
 
 
 
@@ -385,55 +767,71 @@ def monitor(procList, nSecs):
   """
 
   LOG_FILE_NAME = datetime.datetime.now().strftime( "system_monitoring-%Y-%m-%d-%H_%M_%S.txt" )
+  LOG_FILE_PATH = DATA_DIR / LOG_FILE_NAME
+  ROUND_SEPARATOR = "-" * 120 + "\n\n"
 
-  while True:
-    clearScreen()
+  # Names of the processes to monitor, looked up in constant time
+  procSet = frozenset( procList )
 
-    curTime = datetime.datetime.now()
-    now = curTime.timestamp()
+  # Lists of processes to monitor, and of (potentially) problematic processes.
+  # The same lists are emptied and refilled in every monitoring,
+  # so the memory they have grown to is kept instead of being reallocated.
+  procs = []
+  CPU_OUTAGE_PROCS = []
+  MEM_OUTAGE_PROCS = []
+  RUN_TOO_LONG_PROCS = []
 
-    print( f"Attempting to record operating system processes at", end=" ")
-    print( f"{ curTime.strftime( "%H:%M:%S on %Y-%m-%d" ) }\n\nMonitoring system processes...." )
+  faultLists = ( CPU_OUTAGE_PROCS, MEM_OUTAGE_PROCS, RUN_TOO_LONG_PROCS )
 
-    procs = [] # List of processes to monitor
- 
-    # Lists of (potentially) problematic processes
-    CPU_OUTAGE_PROCS = []
-    MEM_OUTAGE_PROCS = []
-    RUN_TOO_LONG_PROCS = []
+  # So that the first monitoring already shows the actual CPU usage
+  primeCpuUsage( procSet )
 
-    procs = getSnapshot( now, procList )
+  # Open the log file only once for the whole monitoring,
+  # instead of opening and closing it for each line written.
+  with openLog( LOG_FILE_PATH ) as logFile:
+    isFirstRound = True
+    while True:
+      clearScreen()
 
-    for p in procs:
-      if p["cpu_usage"] > 70.0:
-        CPU_OUTAGE_PROCS.append(p)
-      elif p["memory_usage"] > 500.0:
-        MEM_OUTAGE_PROCS.append(p)
-      elif p["runtime"] > 3600.0:
-        RUN_TOO_LONG_PROCS.append(p)
+      curTime = datetime.datetime.now()
+      now = curTime.timestamp()
+      recTime = time_readable_format( curTime )
 
-    clearScreen()
+      print( f"Attempting to record operating system processes at", end=" ")
+      print( f"{ recTime }\n\nMonitoring system processes...." )
+
+      # Empty the lists filled in the previous monitoring
+      procs.clear()
+      CPU_OUTAGE_PROCS.clear()
+      MEM_OUTAGE_PROCS.clear()
+      RUN_TOO_LONG_PROCS.clear()
+
+      # Take a snapshot, sorting out the problematic processes at the same time
+      getSnapshot( now, procSet, out=procs, faults=faultLists )
+
+      clearScreen()
 
-    if len(procs) > 0:
-      print( "Done!", end=" " )
+      if len(procs) > 0:
+        print( "Done!", end=" " )
 
-    # Display all the problems among the filtered, monitored processes
-    result = OS_monitoring_summary(
-      curTime.strftime( "at %H:%M:%S on %Y-%m-%d" ),
-      procs, CPU_OUTAGE_PROCS, MEM_OUTAGE_PROCS, RUN_TOO_LONG_PROCS
-    )
+      # Display all the problems among the filtered, monitored processes
+      result = OS_monitoring_summary(
+        f"at { recTime }",
+        procs, CPU_OUTAGE_PROCS, MEM_OUTAGE_PROCS, RUN_TOO_LONG_PROCS
+      )
 
-    # Clear all process list before the next monitoring
-    CPU_OUTAGE_PROCS.clear()
-    MEM_OUTAGE_PROCS.clear()
-    RUN_TOO_LONG_PROCS.clear()
-    procs.clear()
+      # Separate this result from the previous one in the log file.
+      # It is not printed, as the screen has just been cleared anyway.
+      if not isFirstRound:
+        logFile.write( ROUND_SEPARATOR )
+      isFirstRound = False
 
-    PrintAndLog( result, file=LOG_FILE_NAME )
+      PrintAndLog( result, file=logFile )
 
-    time.sleep(nSecs)
+      # Write everything buffered during this round to the disk at once
+      logFile.flush()
 
-    PrintAndLog( "-" * 120, end="\n\n", file=LOG_FILE_NAME )
+      time.sleep(nSecs)
 
 
 
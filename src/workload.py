@@ -1,8 +1,108 @@
+import os
 import time
+import atexit
+import numpy as np
 
-def cpu_load( target_cpu_percent_work=40, duration=60 ):
+# Numba is optional.
+# When installed, work is done by a compiled arithmetic loop;
+# otherwise, the process keeps itself busy by checking the clock.
+try:
+  from numba import njit
+except ImportError:
+  njit = None
+
+# How many iterations of `burn()` fit in a second on this machine.
+# Measured on the first call of `cpu_load()`, then reused.
+itersPerSec = None
+
+# Windows wakes sleeping threads only every 15.6 ms by default,
+# which would stretch every rest of `cpu_load()`.
+# Ask for 1 ms timer resolution while this program runs.
+if os.name == "nt":
+  import ctypes
+  winmm = ctypes.WinDLL( "winmm" )
+  winmm.timeBeginPeriod( 1 )
+  atexit.register( winmm.timeEndPeriod, 1 )
+
+# How early to wake up from a sleep, to wait out the rest of it precisely
+SPIN_TAIL = 0.001 # in seconds
+
+
+
+
+
+def burnLoop(n):
+  """
+  Keep a CPU busy with `n` steps of a linear congruential generator,
+  and return its final state so that the work cannot be skipped.
+  """
+  x = np.uint64(0)
+  multiplier = np.uint64(6364136223846793005)
+  increment = np.uint64(1442695040888963407)
+  for _ in range(n):
+    x = x * multiplier + increment  # wraps around at 64 bits
+  return x
+
+
+
+
+
+if njit is not None:
+  # Compiled once and cached on the disk, so later runs skip the compilation.
+  # The compiled loop also lets other Python threads run while it works.
+  burn = njit( cache=True, nogil=True )( burnLoop )
+else:
+  burn = None
+
+
+
+
+
+def calibrate(sampleIters=1_000_000):
+  """
+  Measure how many iterations of `burn()` run in a second.
+  """
+  global itersPerSec
+
+  # The first call compiles `burn()`, so it is not timed
+  burn(1)
+
+  start = time.perf_counter()
+  burn(sampleIters)
+  itersPerSec = sampleIters / ( time.perf_counter() - start )
+  return itersPerSec
+
+
+
+
+
+def preciseSleep(secs):
+  """
+  Sleep for `secs` seconds more precisely than `time.sleep()` alone.
+
+  Sleeping may overshoot by the timer resolution of the OS,
+  so most of the time is slept, and only the last moment is waited out
+  by checking the clock.
+  """
+  # The clock is checked over and over, so it is looked up only once
+  clock = time.monotonic
+
+  deadline = clock() + secs
+  if secs > 2 * SPIN_TAIL:
+    time.sleep( secs - SPIN_TAIL )
+  while clock() < deadline:
+    pass
+
+
+
+
+
+def cpu_load( target_cpu_percent_work=40, duration=60, ready=None ):
   """
   Controlled CPU workload with duration
+
+  :param ready: an event (e.g. `multiprocessing.Event`) set once the workload is about to start,
+                i.e. after everything needed has been imported and calibrated
   """
 
   # Short intervals can make this program smoother and more stable
@@ -17,20 +117,42 @@ def cpu_load( target_cpu_percent_work=40, duration=60 ):
   # will be used to take a rest
   idleTime = interval - workTime
 
+  # With Numba, the work of each cycle is a fixed number of iterations,
+  # worked out once from how fast this machine runs them
+  if burn is not None:
+    workIters = int( workTime * ( itersPerSec or calibrate() ) )
+
+  # The clock is checked over and over (without Numba, millions of times a second),
+  # so it is looked up only once, as is sleeping
+  clock = time.time
+  sleep = time.sleep
+
+  # Let whoever waits for the workload know it starts now
+  if ready is not None:
+    ready.set()
+
   # To maintain time-bound stress and
   # to avoid infinite loop fiasco
-  end = time.time() + duration
+  end = clock() + duration
 
   # Repeats the control cycles until time is up
-  while time.time() < end:
+  while clock() < end:
 
     # Now the process begins to work
-    start = time.time()
-    while time.time() - start < workTime:
-      pass
+    if burn is not None:
+      burn( workIters )
+    else:
+      # Without Numba, keep busy by checking the clock,
+      # but every 16384 checks, let any other thread waiting for this CPU run for a moment
+      start = clock()
+      checks = 0
+      while clock() - start < workTime:
+        checks += 1
+        if checks & 0x3FFF == 0:
+          sleep(0)
 
     # As this process rests,
     # CPU scheduler can run other processes.
     # This keeps the load staying close to a constant
     # instead of increasing the load.
-    time.sleep( max(0, idleTime) )
+    preciseSleep( idleTime )
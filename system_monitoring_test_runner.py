@@ -11,102 +11,228 @@ validate telemetry under load.
 """
 
 import time      # For CPU loading processes
+import math
+import argparse
 import datetime  # For issuing current date and time
 import threading
-from src.monitor import PrintAndLog, clearScreen, getSnapshot, OS_monitoring_summary
-from src.evaluator import evaluate
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from src.monitor import DATA_DIR, PrintAndLog, clearScreen, getSnapshot, primeCpuUsage, OS_monitoring_summary, time_readable_format
+from src.evaluator import evaluateBatch, warmUp
 from src.workload import cpu_load
 
-snapshots = []
-times_snapshots = []
-
-def monitor_loop(duration, procList):
+# Processes to monitor with specific names, unless others are given with `--proc`.
+# Only will the following processes be monitored.
+# When no names are given (`--proc` alone), though,
+# every process available will be monitored all together.
+DEFAULT_PROC_LIST = [
+  # "MicrosoftSecurityApp.exe",   # Microsoft security
+  # "chrome.exe",                 # Chrome browser
+  "dwm.exe",                    # Desktop window manager
+  "OneDrive.exe",               # OneDrive cloud
+  "SafeConnect.Entry.exe"       # McAfee Safe Connect
+] ;
+
+def monitor_loop(duration, procSet, snapshots, times_snapshots, stop_evt):
   """
   A monitoring tester that observes the processes
   in the operating system.
 
+  Snapshots, and the times they were taken, are filled into
+  `snapshots` and `times_snapshots`.
+  Setting `stop_evt` stops monitoring early.
+
   What this function can do:
   - prevent runaway or unexpected/undefined threads
   - make small-scaled tests deterministic
   - keep execution logic simple
   """
-  end = time.time() + duration
-  while time.time() < end:
-    now = time.time()
-    times_snapshots.append( datetime.datetime.now().strftime( "at %H:%M:%S on %Y-%m-%d" ) ) ;
-    snapshots.append( getSnapshot(now, procList) )
-    time.sleep(1)
+  # Snapshots are taken on a fixed schedule, once a second from the start,
+  # so the time spent taking each snapshot does not delay the next ones.
+  # Waiting on `stop_evt` instead of sleeping lets the main thread stop it at once.
+  #
+  # The clock is read only once per snapshot: the monotonic clock schedules the snapshots,
+  # and the wall-clock time of each one is worked out from it.
+  monotonic = time.monotonic
+  start = monotonic()
+  end = start + duration
+  wall_offset = time.time() - start
+
+  # One snapshot is due every second, so the lists are sized for all of them up front,
+  # then cut down to the snapshots actually taken if stopped early
+  n = 0
+  snapshots[:] = [ None ] * math.ceil( duration )
+  times_snapshots[:] = [ None ] * len( snapshots )
+  while n < len( snapshots ):
+    next_t = start + n
+    mono = monotonic()
+
+    # Snapshots running late (taking over a second each) are not taken after the test is over
+    if mono >= end or stop_evt.wait( max( 0, next_t - mono ) ):
+      break
+
+    # Only the time is kept here; it is formatted when the results are printed
+    now = max( mono, next_t ) + wall_offset
+    times_snapshots[n] = now ;
+    snapshots[n] = getSnapshot(now, procSet)
+    n += 1
+
+  del snapshots[n:]
+  del times_snapshots[n:]
+
+def run_process(process, stop_evt):
+  """
+  Start a process and wait until it ends,
+  so that it can be run and waited for like a thread.
+
+  Setting `stop_evt` terminates the process, or keeps it from starting at all.
+  Raises `RuntimeError` if the process fails.
+  """
+  if stop_evt.is_set():
+    return
+  process.start()
+
+  # Check now and then whether to stop, while waiting for the process
+  while process.is_alive():
+    if stop_evt.wait( 0.1 ):
+      process.terminate()
+      process.join()
+      return
+  process.join()
+
+  if process.exitcode != 0:
+    raise RuntimeError( f"{ process.name } ended with exit code { process.exitcode }" )
+
+def print_monitor_test_result(results, snapshots, times_snapshots, logFile):
+  """
+  Summarise the results of all snapshots into the test log.
 
-def print_monitor_test_result(all_results):
-  LOG_TEST_FILE = datetime.datetime.now().strftime( "system_monitoring-test-%Y-%m-%d-%H_%M_%S.txt" )
+  :param results: results of evaluating each snapshot, in the same order,
+                  used one at a time as they come (e.g. from `evaluateBatch()`)
+  """
+  # Separates the results of consecutive snapshots
+  SNAPSHOT_SEPARATOR = '\n' + "-" * 120 + "\n\n"
 
-  resultCtnt = f"Total snapshots taken during the monitoring test: { len(all_results) }\n\n"
+  # Collect the results of all the snapshots first,
+  # then join them into one string at once
+  resultParts = [ f"Total snapshots taken during the monitoring test: { len(snapshots) }\n\n" ]
 
-  for i in range( len(all_results) ):
-    cpuExceed = all_results[i]["cpu_violations"]
-    memExceed = all_results[i]["mem_violations"]
-    runExceed = all_results[i]["runtime_violations"]
+  # Each snapshot is summarised as soon as it is evaluated
+  for ( i, result ) in enumerate( results ):
+    cpuExceed = result["cpu_violations"]
+    memExceed = result["mem_violations"]
+    runExceed = result["runtime_violations"]
 
-    resultCtnt += OS_monitoring_summary(
-      times_snapshots[i], snapshots[i],
+    resultParts.append( OS_monitoring_summary(
+      f"at { time_readable_format( datetime.datetime.fromtimestamp( times_snapshots[i] ) ) }", snapshots[i],
       cpuExceed, memExceed, runExceed
-    ) ;
+    ) ) ;
 
-    if i + 1 < len(all_results):
-      resultCtnt += '\n' + "-" * 120 + "\n\n"
+    if i + 1 < len(snapshots):
+      resultParts.append( SNAPSHOT_SEPARATOR )
 
-  PrintAndLog(resultCtnt, file=LOG_TEST_FILE)
+  PrintAndLog("".join( resultParts ), file=logFile)
 
-if __name__ == "__main__":
-  clearScreen()
+def run_monitor_test(duration=10, work_percentage=70, procList=DEFAULT_PROC_LIST):
+  """
+  Run the whole test: load the CPU and monitor the processes at the same time,
+  then evaluate the snapshots and print the results.
 
-  # duration spent in testing; in seconds
-  DURATION = 10
+  :param duration: duration spent in testing; in seconds
+  :param work_percentage: how much of an interval to spent on work for CPU load, in percent (%)
+  :param procList: names of the processes to monitor; every process if empty
+  """
+  clearScreen()
 
-  # How much of an interval to spent on work for CPU load, in percent (%)
-  WORK_PERCENTAGE = 70
+  # The test log is named after when the test starts
+  LOG_TEST_FILE = DATA_DIR / datetime.datetime.now().strftime( "system_monitoring-test-%Y-%m-%d-%H_%M_%S.txt" )
 
   print( "This test will monitor the resources in the operating system.\n" )
-  print( f"It will last about {DURATION} { "second" if DURATION == 1 else "seconds" },", end="\n" )
-  print( f"with {WORK_PERCENTAGE}% of the time spent on CPU loading.\n")
-  print( "Now testing monitoring processes..." )
-
-  # Processes to monitor with specific names.
-  # Only will the following processes be monitored.
-  # When the following list is empty, though,
-  # every process available will be monitored all together.
-
-  # This process list will monitor all the processes shown in the following list.
-  # If not specified, all processes will be monitored.
-  # You may change the processes to monitor as needed.
-  procList = [
-    # "MicrosoftSecurityApp.exe",   # Microsoft security
-    # "chrome.exe",                 # Chrome browser
-    "dwm.exe",                    # Desktop window manager
-    "OneDrive.exe",               # OneDrive cloud
-    "SafeConnect.Entry.exe"       # McAfee Safe Connect
-  ] ;
+  print( f"It will last about {duration:g} { "second" if duration == 1 else "seconds" },", end="\n" )
+  print( f"with {work_percentage:g}% of the time spent on CPU loading.\n")
+  # Compile the threshold checks before the test starts (if Numba is installed),
+  # so the compilation neither competes with the test nor delays the evaluation
+  warmUp()
 
-  # Two threads (can be executed concurrently)
-  thread_monitorSysProcs = threading.Thread( target=monitor_loop, args=( DURATION, procList ) )
-  thread_loads_of_CPU = threading.Thread( target=cpu_load, args=( WORK_PERCENTAGE, DURATION ) )
-
-  thread_monitorSysProcs.start()
-  thread_loads_of_CPU.start()
+  print( "Now testing monitoring processes..." )
 
-  thread_monitorSysProcs.join()
-  thread_loads_of_CPU.join()
+  # Names are looked up for every process in every snapshot,
+  # so they are kept in a set, made once for the whole test
+  procSet = frozenset( procList )
+
+  # Read the processes once beforehand,
+  # so that the first snapshot of the test already shows the actual CPU usage
+  primeCpuUsage( procSet )
+
+  # Snapshots taken during the test, and when they were taken
+  snapshots = []
+  times_snapshots = []
+
+  # Set to stop monitoring and the workload early, if either of them fails
+  stop_evt = threading.Event()
+
+  # Monitoring in a thread, and CPU loading in a separate process
+  # (can be executed concurrently).
+  # In its own process, the workload never holds this process' GIL,
+  # so monitoring is not held back while the CPU is loaded.
+  #
+  # The process is spawned afresh, as on Windows, rather than forked:
+  # a fork would copy the worker threads Numba may have started for `warmUp()`.
+  #
+  # A fresh process takes a while (importing and calibrating) before it loads the CPU,
+  # so it tells when it actually starts through `load_ready`.
+  mpContext = multiprocessing.get_context( "spawn" )
+  load_ready = mpContext.Event()
+  process_loads_of_CPU = mpContext.Process( target=cpu_load, args=( work_percentage, duration, load_ready ) )
+
+  with ThreadPoolExecutor( max_workers=2 ) as executor:
+    # Whichever way this thread stops waiting (the test is over, either side fails,
+    # or e.g. Ctrl+C is pressed), monitoring and the workload are stopped at once,
+    # so that leaving this block does not wait for the rest of the test.
+    try:
+      loading = executor.submit( run_process, process_loads_of_CPU, stop_evt )
+
+      # Start monitoring only once the workload has started,
+      # so that both cover the same time window
+      while not load_ready.wait( 0.1 ):
+        if loading.done():
+          loading.result()  # the workload failed before it could start
+
+      monitoring = executor.submit( monitor_loop, duration, procSet, snapshots, times_snapshots, stop_evt )
+
+      # Both normally run until the test is over.
+      # If either of them fails, though, the other one is stopped at once
+      # instead of running out the rest of the test.
+      wait( [ monitoring, loading ], return_when=FIRST_EXCEPTION )
+    finally:
+      stop_evt.set()
+
+  # Report the failure, if any, rather than evaluating an incomplete test
+  monitoring.result()
+  loading.result()
 
   # Evaluation phase (no side effects)
-  all_results = []
-
-  for s in snapshots:
-    # Threshold setup:
-    # CPU usage: 70%
-    # memory usage: 500MB
-    # running time: 3600 seconds since started
-    all_results.append( evaluate( s, 70, 500, 3600 ) )
+  # All the snapshots are checked against the thresholds at once,
+  # then their results are summarised one by one as they are picked out.
+  #
+  # Threshold setup:
+  # CPU usage: 70%
+  # memory usage: 500MB
+  # running time: 3600 seconds since started
+  results = evaluateBatch( snapshots, 70, 500, 3600 )
 
   clearScreen()
-  print_monitor_test_result(all_results)
+  print_monitor_test_result(results, snapshots, times_snapshots, LOG_TEST_FILE)
   print( f"Test completed." )
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser( description="Monitor the processes in the operating system while the CPU is loaded." )
+  parser.add_argument( "--duration", type=float, default=10,
+                       help="duration spent in testing, in seconds (default: 10)" )
+  parser.add_argument( "--work-percentage", type=float, default=70,
+                       help="how much of an interval to spend on work for CPU load, in percent (default: 70)" )
+  parser.add_argument( "--proc", nargs="*", default=DEFAULT_PROC_LIST, metavar="NAME",
+                       help="names of the processes to monitor; give none to monitor every process" )
+  args = parser.parse_args()
+
+  run_monitor_test( args.duration, args.work_percentage, args.proc )